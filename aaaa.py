@@ -1,11 +1,23 @@
 import os
 import json
+import hashlib
+import mimetypes
+import threading
+import time
 import fitz  # PyMuPDF
 import pymupdf4llm
 import requests
 import urllib3
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit
+
+try:
+    import orjson  # optional: much faster JSON output
+except ImportError:
+    orjson = None
 
 # =====================================================
 # SSL FIX (CORPORATE / SELF-SIGNED CERTS)
@@ -25,15 +37,49 @@ PASSWORD = "Narasamma@65"
 
 PORTAL_DOMAIN = "premera.zavanta.com"
 
+# Parallel page fetches against the portal, and the minimum spacing
+# (seconds) between two requests to the same host
+MAX_WORKERS = 8
+MIN_REQUEST_INTERVAL = 0.1
+
+# Optional focus for large portals: CRAWL_MAX_PAGES caps the crawl, and
+# CRAWL_KEYWORDS (comma-separated, e.g. "bluecard,fep") decides which links
+# make the cut by moving matching ones to the front of each level. Unset,
+# the crawl is a plain breadth-first walk of everything.
+CRAWL_KEYWORDS = [kw.strip() for kw in os.environ.get("CRAWL_KEYWORDS", "").lower().split(",") if kw.strip()]
+MAX_PAGES = int(os.environ["CRAWL_MAX_PAGES"]) if os.environ.get("CRAWL_MAX_PAGES", "").strip() else None
+
+# Links with these extensions are never HTML pages; they are recorded as
+# skipped without issuing a request
+NON_HTML_EXTENSIONS = (
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".zip",
+    ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico",
+    ".css", ".js", ".woff", ".woff2", ".ttf", ".mp3", ".mp4"
+)
+
+# Query parameters that only track where a click came from; they are
+# dropped so the same page shared from e-mail/Teams is fetched once
+TRACKING_PARAM_PREFIXES = ("utm_", "fbclid", "gclid", "msclkid", "mc_cid", "mc_eid")
+
+# Page text format: pymupdf4llm markdown (headings, tables) or PyMuPDF's
+# plain text, which skips the layout analysis and is much faster on big PDFs
+PDF_MARKDOWN = True
+
+# One JSON line per crawled page, written as pages arrive. It only survives
+# an interrupted crawl (the next run resumes from it) and is deleted once a
+# crawl completes, so every finished run reflects the current portal content.
+PORTAL_JOURNAL_PATH = "portal_pages.jsonl"
+
 
 # -----------------------------------------------------
 # PDF TEXT + LINK EXTRACTION (CORRECT pymupdf4llm USAGE)
 # -----------------------------------------------------
-def extract_pdf_content(pdf_path):
+def extract_pdf_content(pdf_path, markdown=PDF_MARKDOWN):
     doc = fitz.open(pdf_path)
 
-    # Convert entire PDF to markdown ONCE
-    markdown_pages = pymupdf4llm.to_markdown(pdf_path)
+    # Convert entire PDF to markdown ONCE, on the already-open document;
+    # page_chunks gives one chunk per page, aligned with the loop below
+    markdown_pages = pymupdf4llm.to_markdown(doc, page_chunks=True) if markdown else None
 
     pdf_data = {
         "file_name": os.path.basename(pdf_path),
@@ -41,20 +87,32 @@ def extract_pdf_content(pdf_path):
     }
 
     for page_index, page in enumerate(doc):
+        uri_links = [link for link in page.get_links() if link.get("uri")]
+
+        # Extract the page's text once; every link rect is clipped from it
+        textpage = page.get_textpage() if uri_links else None
+
         links = []
-        for link in page.get_links():
-            if link.get("uri"):
-                links.append({
-                    "text": page.get_textbox(link["from"]),
-                    "url": link["uri"]
-                })
+        for link in uri_links:
+            links.append({
+                "text": page.get_textbox(link["from"], textpage=textpage),
+                "url": link["uri"]
+            })
+
+        if markdown:
+            page_text = markdown_pages[page_index]["text"]
+        else:
+            # get_text("text")'s own flags (mediabox clip, whitespace,
+            # ligatures), not the flags=0 TextPage used for link anchors
+            page_text = page.get_text("text", flags=fitz.TEXTFLAGS_TEXT)
 
         pdf_data["pages"].append({
             "page_number": page_index + 1,
-            "text": markdown_pages[page_index],
+            "text": page_text,
             "links": links
         })
 
+    doc.close()
     return pdf_data
 
 
@@ -64,6 +122,12 @@ def extract_pdf_content(pdf_path):
 def create_portal_session():
     session = requests.Session()
 
+    # One pooled keep-alive connection per crawler worker, so raising
+    # MAX_WORKERS never makes urllib3 drop and reopen TLS connections
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
     login_url = "https://premera.zavanta.com/login"
 
     payload = {
@@ -82,45 +146,281 @@ def create_portal_session():
 
 
 # -----------------------------------------------------
-# RECURSIVE HTML CRAWLER (FIXES CHILD TEXT ISSUE)
+# URL CANONICALISATION (ONE KEY PER PAGE FOR DEDUP)
 # -----------------------------------------------------
-def crawl_zavanta_pages(session, start_url, visited, max_depth=2, depth=0, parent_url=None):
-    if depth > max_depth:
-        return []
+@lru_cache(maxsize=8192)
+def canonicalize_url(url):
+    # Lowercase scheme/host, drop default ports, the #fragment and tracking
+    # parameters, and sort the rest of the query (kept exactly as encoded).
+    # The path is left alone: its case and trailing slash can be significant.
+    parts = urlsplit(url)
+    try:
+        port = parts.port
+    except ValueError:
+        return url.split("#", 1)[0]
+
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    if port is not None and port != {"http": 80, "https": 443}.get(scheme):
+        netloc += f":{port}"
+    query = "&".join(sorted(
+        p for p in parts.query.split("&")
+        if p and not p.split("=", 1)[0].lower().startswith(TRACKING_PARAM_PREFIXES)
+    ))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
 
-    if start_url in visited:
-        return []
 
-    visited.add(start_url)
+# -----------------------------------------------------
+# PORTAL DOMAIN CHECK (CACHED PER HOST)
+# -----------------------------------------------------
+@lru_cache(maxsize=1024)
+def is_portal_host(netloc):
+    # Exact host or subdomain match; a plain substring test would also
+    # accept hosts like premera.zavanta.com.example.net
+    host = netloc.rsplit("@", 1)[-1].split(":", 1)[0].lower()
+    return host == PORTAL_DOMAIN or host.endswith("." + PORTAL_DOMAIN)
+
+
+def is_portal_url(url):
+    return is_portal_host(urlparse(url).netloc)
+
+
+# -----------------------------------------------------
+# PER-DOMAIN POLITENESS (SHARED BY ALL CRAWLER WORKERS)
+# -----------------------------------------------------
+class DomainRateLimiter:
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if self.min_interval <= 0:
+            return
+
+        # Reserve the next free slot for this host under the lock, then sleep
+        # outside it, so other hosts (and other slots) are never blocked
+        domain = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(domain, now))
+            self._next_slot[domain] = slot + self.min_interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# -----------------------------------------------------
+# FETCH + PARSE ONE PORTAL PAGE
+# -----------------------------------------------------
+def skipped_page(url, parent_url, content_type):
+    return {
+        "url": url,
+        "parent_url": parent_url,
+        "status": "skipped_non_html",
+        "content_type": content_type
+    }
 
+
+def header_charset(content_type_header):
+    # charset= parameter of a Content-Type header, or None. requests'
+    # response.encoding is not used: it reports ISO-8859-1 for any text/*
+    # response that declares no charset
+    for param in content_type_header.split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset":
+            return value.strip().strip("\"'") or None
+    return None
+
+
+def fetch_portal_page(session, url, parent_url=None, rate_limiter=None):
+    if urlparse(url).path.lower().endswith(NON_HTML_EXTENSIONS):
+        return skipped_page(url, parent_url, mimetypes.guess_type(url)[0] or ""), []
+
+    if rate_limiter:
+        rate_limiter.wait(url)
+
+    response = None
     try:
-        response = session.get(start_url, timeout=30, verify=False)
+        response = session.get(url, timeout=30, verify=False, stream=True)
         response.raise_for_status()
     except Exception:
-        return []
+        # A streamed response holds its socket until closed; close it now
+        # rather than leaving it to the garbage collector
+        if response is not None:
+            response.close()
+        return None, []
+
+    # PDFs, images, zips etc. are not crawlable: bail out before the body is downloaded
+    content_type_header = response.headers.get("Content-Type", "")
+    content_type = content_type_header.split(";")[0].strip().lower()
+    if content_type and not content_type.startswith(("text/html", "application/xhtml")):
+        response.close()
+        return skipped_page(url, parent_url, content_type), []
+
+    # With stream=True the body is only downloaded here, so read timeouts and
+    # broken transfers surface now and must skip the page like any fetch error
+    try:
+        body = response.content
+    except Exception:
+        response.close()
+        return None, []
 
-    soup = BeautifulSoup(response.text, "lxml")
+    # Hand the parser the raw bytes plus the header charset (which takes
+    # precedence over <meta charset>); without either, bs4 would fall back
+    # to sniffing the whole body
+    soup = BeautifulSoup(body, "lxml", from_encoding=header_charset(content_type_header))
     page_text = soup.get_text(separator=" ", strip=True)
 
-    results = [{
-        "url": start_url,
-        "parent_url": parent_url,
-        "text": page_text
-    }]
+    # Links that resolve under this page's own origin need no further
+    # parsing; only off-origin ones get their netloc checked
+    base = urlparse(url)
+    origin = f"{base.scheme}://{base.netloc}/"
+    origin_on_portal = is_portal_host(base.netloc)
 
+    # Canonicalise each link once so in-page anchors, reordered queries and
+    # repeated nav links collapse to one URL for the visited check
+    child_urls = []
+    seen = set()
     for a in soup.find_all("a", href=True):
-        next_url = urljoin(start_url, a["href"])
-        if PORTAL_DOMAIN in urlparse(next_url).netloc:
-            results.extend(
-                crawl_zavanta_pages(
-                    session=session,
-                    start_url=next_url,
-                    visited=visited,
-                    max_depth=max_depth,
-                    depth=depth + 1,
-                    parent_url=start_url
-                )
-            )
+        next_url = canonicalize_url(urljoin(url, a["href"]))
+        if next_url in seen:
+            continue
+        seen.add(next_url)
+
+        if next_url.startswith(origin):
+            on_portal = origin_on_portal
+        else:
+            on_portal = is_portal_url(next_url)
+        if on_portal:
+            child_urls.append(next_url)
+
+    return {
+        "url": url,
+        "parent_url": parent_url,
+        "text": page_text,
+        "child_urls": child_urls
+    }, child_urls
+
+
+# -----------------------------------------------------
+# CRAWL JOURNAL (RESUME AFTER CRASH / RERUN)
+# -----------------------------------------------------
+def json_line(data):
+    if orjson is not None:
+        return orjson.dumps(data) + b"\n"
+    return (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def load_crawl_journal(journal_path):
+    pages = {}
+    if not os.path.exists(journal_path):
+        return pages
+
+    loads = orjson.loads if orjson is not None else json.loads
+    with open(journal_path, "rb") as f:
+        for line in f:
+            try:
+                page = loads(line)
+            except ValueError:
+                continue  # blank or torn last line of an interrupted run
+            pages[page["url"]] = page
+
+    return pages
+
+
+# -----------------------------------------------------
+# CONCURRENT BREADTH-FIRST HTML CRAWLER (FIXES CHILD TEXT ISSUE)
+# -----------------------------------------------------
+def content_digest(text):
+    # Case/whitespace-insensitive, so re-rendered copies of a page match
+    normalized = " ".join(text.lower().split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def link_score(url, keywords):
+    # Path and query only: the scheme/host is the same for every portal link,
+    # so a keyword matching it would score all links alike
+    parts = urlsplit(url)
+    target = f"{parts.path}?{parts.query}".lower()
+    return sum(kw in target for kw in keywords)
+
+
+def crawl_zavanta_pages(session, start_urls, visited, max_depth=2, max_workers=MAX_WORKERS,
+                        journal_path=None, keywords=None, max_pages=None,
+                        min_interval=MIN_REQUEST_INTERVAL):
+    journaled = load_crawl_journal(journal_path) if journal_path else {}
+    rate_limiter = DomainRateLimiter(min_interval)
+
+    def fetch(item):
+        url, parent_url = item
+        if url in journaled:
+            # Parent as reached in this crawl, not the interrupted one
+            page = dict(journaled[url], parent_url=parent_url)
+            return page, page.get("child_urls", [])
+        return fetch_portal_page(session, url, parent_url, rate_limiter)
+
+    results = []
+    first_by_digest = {}
+    frontier = []
+    for url in map(canonicalize_url, start_urls):
+        if url not in visited:
+            visited.add(url)
+            frontier.append((url, None))
+
+    journal = open(journal_path, "ab") if journal_path else None
+    try:
+        # Every page of one depth level is fetched in parallel; the next level
+        # is only built from links not seen before, so nothing is fetched twice
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for depth in range(max_depth + 1):
+                if max_pages is not None:
+                    # Each level is fetched whole, so ranking only matters when
+                    # the budget cuts it: stable sort puts on-topic links first
+                    if keywords:
+                        frontier.sort(key=lambda item: link_score(item[0], keywords), reverse=True)
+                    frontier = frontier[:max(max_pages - len(results), 0)]
+                if not frontier:
+                    break
+
+                next_frontier = []
+                for page, child_urls in pool.map(fetch, frontier):
+                    if page is None:
+                        continue
+
+                    if journal and page["url"] not in journaled:
+                        journal.write(json_line(page))
+                        journal.flush()
+
+                    # Pages whose text already appeared under another URL keep
+                    # only a pointer to the first copy (links are still followed)
+                    if page.get("text"):
+                        digest = content_digest(page["text"])
+                        first_url = first_by_digest.setdefault(digest, page["url"])
+                        if first_url != page["url"]:
+                            page = {
+                                "url": page["url"],
+                                "parent_url": page["parent_url"],
+                                "duplicate_of": first_url,
+                                "child_urls": child_urls
+                            }
+                    results.append(page)
+
+                    if depth == max_depth:
+                        continue
+                    for child_url in child_urls:
+                        if child_url not in visited:
+                            visited.add(child_url)
+                            next_frontier.append((child_url, page["url"]))
+
+                frontier = next_frontier
+    finally:
+        if journal:
+            journal.close()
+
+    # Resume-only: a completed crawl must not serve stale pages to the next run
+    if journal_path and os.path.exists(journal_path):
+        os.remove(journal_path)
 
     return results
 
@@ -131,43 +431,58 @@ def crawl_zavanta_pages(session, start_url, visited, max_depth=2, depth=0, paren
 def run_pipeline():
     final_output = {}
 
-    # Step 1: PDF extraction
-    pdf_data = extract_pdf_content(PDF_PATH)
+    # Step 1: PDF extraction, overlapped with the portal login (the two
+    # are independent, so the CPU-bound parse hides the login round trips)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pdf_future = pool.submit(extract_pdf_content, PDF_PATH)
+        session = create_portal_session()
+        pdf_data = pdf_future.result()
     final_output["pdf"] = pdf_data
 
-    # Step 2: Collect Zavanta links from PDF
+    # Step 2: Collect Zavanta links from PDF (one host check per link)
     portal_links = {
         link["url"]
         for page in pdf_data["pages"]
         for link in page["links"]
-        if PORTAL_DOMAIN in link["url"]
+        if is_portal_url(link["url"])
     }
 
-    # Step 3: Recursive portal + child HTML extraction
-    session = create_portal_session()
+    # Step 3: Concurrent portal + child HTML extraction
     visited = set()
-    portal_results = []
 
-    for url in portal_links:
-        extracted_pages = crawl_zavanta_pages(
-            session=session,
-            start_url=url,
-            visited=visited,
-            max_depth=2   # Increase to 3 if deeper nesting exists
-        )
-        portal_results.extend(extracted_pages)
+    portal_results = crawl_zavanta_pages(
+        session=session,
+        start_urls=sorted(portal_links),
+        visited=visited,
+        max_depth=2,  # Increase to 3 if deeper nesting exists
+        journal_path=PORTAL_JOURNAL_PATH,
+        keywords=CRAWL_KEYWORDS,
+        max_pages=MAX_PAGES
+    )
 
     final_output["portal_html"] = portal_results
     return final_output
 
 
+# -----------------------------------------------------
+# SAVE OUTPUT (orjson WHEN AVAILABLE)
+# -----------------------------------------------------
+def save_json(data, output_path):
+    if orjson is not None:
+        with open(output_path, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        return
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
 # -----------------------------------------------------
 # RUN
 # -----------------------------------------------------
 if __name__ == "__main__":
     result = run_pipeline()
 
-    with open("extracted_output.json", "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
+    save_json(result, "extracted_output.json")
 
     print("✅ SUCCESS: extracted_output.json generated")
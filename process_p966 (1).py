@@ -13,6 +13,12 @@ Usage:
 import os
 import sys
 import json
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson  # optional: much faster JSON output
+except ImportError:
+    orjson = None
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -40,6 +46,25 @@ def extract_pdf_content(pdf_path: str) -> str:
         sys.exit(1)
 
 
+def _dump(path: str, obj):
+    """Write obj as indented JSON (orjson when installed, else stdlib json)"""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, indent=2, default=str)
+
+
+def _write_claim_type_files(base_path: str, mermaid_content: str, dot_content: str, subgraph: dict):
+    """Save the Mermaid, GraphViz and JSON files for one claim type"""
+    with open(f'{base_path}.mermaid', 'w', encoding='utf-8') as f:
+        f.write(mermaid_content)
+    with open(f'{base_path}.dot', 'w', encoding='utf-8') as f:
+        f.write(dot_content)
+    _dump(f'{base_path}.json', subgraph)
+
+
 def save_outputs(result: dict, output_dir: str):
     """Save all outputs to files"""
     os.makedirs(output_dir, exist_ok=True)
@@ -51,20 +76,17 @@ def save_outputs(result: dict, output_dir: str):
     
     # 1. Save World Network JSON
     wn_path = os.path.join(output_dir, 'world_network_v2.json')
-    with open(wn_path, 'w', encoding='utf-8') as f:
-        json.dump(network.to_dict(), f, indent=2, default=str)
+    _dump(wn_path, network.to_dict())
     print(f"✓ World Network JSON: {wn_path}")
     
     # 2. Save Parsed Data JSON
     parsed_path = os.path.join(output_dir, 'parsed_sop_v2.json')
-    with open(parsed_path, 'w', encoding='utf-8') as f:
-        json.dump(result['parsed_data'], f, indent=2, default=str)
+    _dump(parsed_path, result['parsed_data'])
     print(f"✓ Parsed SOP JSON: {parsed_path}")
     
     # 3. Save Observation Network JSON
     on_path = os.path.join(output_dir, 'observation_network_v2.json')
-    with open(on_path, 'w', encoding='utf-8') as f:
-        json.dump(result['observation_network'].to_dict(), f, indent=2, default=str)
+    _dump(on_path, result['observation_network'].to_dict())
     print(f"✓ Observation Network JSON: {on_path}")
     
     # 4. Save Decision Tree Summary (Human Readable)
@@ -97,33 +119,29 @@ def save_outputs(result: dict, output_dir: str):
     
     print(f"\n📊 Saving per-claim-type graphs to: {claim_types_dir}")
     
+    jobs = []
     for claim_type, mermaid_content in result['visualizations']['by_claim_type']['mermaid'].items():
         # Sanitize filename
         safe_name = claim_type.replace('/', '_').replace(' ', '_').replace('(', '').replace(')', '')
         safe_name = safe_name.replace(',', '').replace("'", '')
         
-        # Save Mermaid
-        ct_mermaid = os.path.join(claim_types_dir, f'{safe_name}.mermaid')
-        with open(ct_mermaid, 'w', encoding='utf-8') as f:
-            f.write(mermaid_content)
-        
-        # Save GraphViz
-        ct_dot = os.path.join(claim_types_dir, f'{safe_name}.dot')
-        with open(ct_dot, 'w', encoding='utf-8') as f:
-            f.write(result['visualizations']['by_claim_type']['graphviz'][claim_type])
-        
-        # Save individual JSON subgraph
-        subgraph = network.get_claim_type_graph(claim_type)
-        ct_json = os.path.join(claim_types_dir, f'{safe_name}.json')
-        with open(ct_json, 'w', encoding='utf-8') as f:
-            json.dump(subgraph, f, indent=2, default=str)
-        
+        jobs.append((
+            os.path.join(claim_types_dir, safe_name),
+            mermaid_content,
+            result['visualizations']['by_claim_type']['graphviz'][claim_type],
+            network.get_claim_type_graph(claim_type)
+        ))
+    
+    # Files for different claim types are independent, so write them concurrently
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda job: _write_claim_type_files(*job), jobs))
+    
+    for claim_type in result['visualizations']['by_claim_type']['mermaid']:
         print(f"   ✓ {claim_type}")
     
     # 9. Save Statistics
     stats_path = os.path.join(output_dir, 'statistics_v2.json')
-    with open(stats_path, 'w', encoding='utf-8') as f:
-        json.dump(result['statistics'], f, indent=2)
+    _dump(stats_path, result['statistics'])
     print(f"\n✓ Statistics JSON: {stats_path}")
     
     # 10. Save Deep Links Report
@@ -144,8 +162,7 @@ def save_outputs(result: dict, output_dir: str):
             if not ref.resolved
         ]
     }
-    with open(deep_links_path, 'w', encoding='utf-8') as f:
-        json.dump(deep_links, f, indent=2)
+    _dump(deep_links_path, deep_links)
     print(f"✓ Deep Links JSON: {deep_links_path}")
     
     # 11. Save raw markdown content
@@ -113,7 +113,7 @@ class WorldNetwork:
 
 
 class SOPParser:
-    PATTERNS = [
+    PATTERNS = [re.compile(p, re.MULTILINE | re.IGNORECASE) for p in (
         r'###\s*\*\*\s*(Amazon\s+Claims?)\s*\*\*',
         r'###\s*\*\*\s*(Alaska\s+Air.*?Claims?)\s*\*\*',
         r'###\s*\*\*\s*(Microsoft\s+Claims?)\s*\*\*',
@@ -125,31 +125,38 @@ class SOPParser:
         r'^#+\s*(Microsoft\s+Claims?)',
         r'^#+\s*(All\s+Others?)',
         r'^###\s*\*\*([^*]+)\*\*',
-    ]
+    )]
     
     STEP_PAT = re.compile(r'^(\d+)\.\s+(.+)', re.MULTILINE)
     DEC_PAT = re.compile(r'^(?:Is|Does|Did|Are|Has|Have|Was|Were|Can|Should|Will|Would)\s+', re.IGNORECASE)
     PROC_PAT = re.compile(r'(PR\.OP\.CL\.\d{4})')
+    REF_TITLE_PAT = re.compile(r'(PR\.OP\.CL\.\d{4})(?=\s*[-:]\s*([^.\n]+))')  # lookahead: titles may hold the next code
     VER_PAT = re.compile(r'^\|\s*(\d+\.\d+)\s*\|\s*(\d{1,2}/\d{1,2}/\d{4}[^|]*)\s*\|\s*([^|]+)\s*\|', re.MULTILINE)
     YES_PAT = re.compile(r'^\s*[-*]?\s*\*?\*?(?:I\s+)?(Yes)\s*[:\*\*]*\s*(.*)', re.IGNORECASE)
     NO_PAT = re.compile(r'^\s*[-*]?\s*\*?\*?(?:I\s+)?(No)\s*[:\*\*]*\s*(.*)', re.IGNORECASE)
     UNSURE_PAT = re.compile(r'^\s*[-*]?\s*\*?\*?(?:I\s+)?(Unsure)\s*[:\*\*]*\s*(.*)', re.IGNORECASE)
     SUB_COND_PAT = re.compile(r'^\s*[-*]?\s*\*?\*?([A-Z][a-z]+(?:-[a-z]+)?(?:\s+[a-z]+)?)\s*[:\*\*]+\s*(.*)', re.IGNORECASE)
+    NESTED_YES_PAT = re.compile(r'^\s*I?\s*\*?\*?(Yes)\s*[:\*\*]+\s*(.*)', re.IGNORECASE)
+    NESTED_NO_PAT = re.compile(r'^\s*I?\s*\*?\*?(No)\s*[:\*\*]+\s*(.*)', re.IGNORECASE)
+    TITLE_PAT = re.compile(r'^#\s+\*?\*?(.+?)\*?\*?\s*$', re.MULTILINE)
+    DOC_ID_PAT = re.compile(r'\b(P\d{3,4})\b')
+    CURRENT_PAT = re.compile(r'current', re.IGNORECASE)
+    NOT_SUB_LABELS = frozenset(['important', 'note', 'page', 'refer', 'the', 'when', 'using', 'location'])
     
     def parse(self, text): return {'document_info': self._doc_info(text), 'versions': self._versions(text), 'sections': self._sections(text), 'procedure_references': self._all_refs(text), 'raw_text': text}
     def _doc_info(self, t):
         info = {'title': '', 'document_id': '', 'status': ''}
-        m = re.search(r'^#\s+\*?\*?(.+?)\*?\*?\s*$', t, re.MULTILINE)
+        m = self.TITLE_PAT.search(t)
         if m: info['title'] = m.group(1).strip()
-        m = re.search(r'\b(P\d{3,4})\b', t)
+        m = self.DOC_ID_PAT.search(t)
         if m: info['document_id'] = m.group(1)
-        if 'CURRENT' in t.upper() or 'Approved' in t: info['status'] = 'Current'
+        if self.CURRENT_PAT.search(t) or 'Approved' in t: info['status'] = 'Current'
         return info
     def _versions(self, t): return [{'revision': m.group(1), 'date': m.group(2).strip(), 'description': m.group(3).strip()} for m in self.VER_PAT.finditer(t)]
     def _sections(self, t):
         matches = []; seen = set()
         for p in self.PATTERNS:
-            for m in re.finditer(p, t, re.MULTILINE | re.IGNORECASE):
+            for m in p.finditer(t):
                 n = m.group(1).strip().lower()
                 if n not in seen and len(n) > 3: seen.add(n); matches.append((m.start(), m.group(1).strip()))
         matches.sort(key=lambda x: x[0]); secs = []
@@ -187,8 +194,8 @@ class SOPParser:
                     branches.append(current_branch)
                 current_branch = {'type': 'unsure', 'content': unsure_m.group(2).strip(), 'sub_conditions': [], 'procedure_refs': [], 'indent': leading}; branch_indent = leading
             elif current_branch:
-                nested_yes = re.match(r'^\s*I?\s*\*?\*?(Yes)\s*[:\*\*]+\s*(.*)', stripped, re.IGNORECASE)
-                nested_no = re.match(r'^\s*I?\s*\*?\*?(No)\s*[:\*\*]+\s*(.*)', stripped, re.IGNORECASE)
+                nested_yes = self.NESTED_YES_PAT.match(stripped)
+                nested_no = self.NESTED_NO_PAT.match(stripped)
                 sub_m = self.SUB_COND_PAT.match(stripped)
                 if nested_yes and leading > branch_indent:
                     if current_sub: current_branch['sub_conditions'].append(current_sub)
@@ -198,7 +205,7 @@ class SOPParser:
                     current_sub = {'type': 'no', 'label': 'No', 'content': nested_no.group(2).strip(), 'procedure_refs': list(set(self.PROC_PAT.findall(nested_no.group(2))))}
                 elif sub_m and leading > branch_indent:
                     label = sub_m.group(1).strip()
-                    if label.lower() not in ['important', 'note', 'page', 'refer', 'the', 'when', 'using', 'location']:
+                    if label.lower() not in self.NOT_SUB_LABELS:
                         if current_sub: current_branch['sub_conditions'].append(current_sub)
                         current_sub = {'type': 'sub', 'label': label, 'content': sub_m.group(2).strip(), 'procedure_refs': list(set(self.PROC_PAT.findall(sub_m.group(2))))}
                     elif current_sub: current_sub['content'] += ' ' + stripped
@@ -210,16 +217,13 @@ class SOPParser:
         for b in branches: b['procedure_refs'] = list(set(self.PROC_PAT.findall(b['content'])))
         return branches
     def _all_refs(self, t):
-        seen = set(); refs = []
-        for m in self.PROC_PAT.finditer(t):
-            c = m.group(1)
-            if c in seen: continue
-            seen.add(c); tm = re.search(rf'{c}\s*[-:]\s*([^.\n]+)', t)
-            refs.append({'code': c, 'title': tm.group(1).strip() if tm else ''})
-        return refs
+        titles = {}
+        for m in self.REF_TITLE_PAT.finditer(t): titles.setdefault(m.group(1), m.group(2).strip())
+        return [{'code': c, 'title': titles.get(c, '')} for c in dict.fromkeys(self.PROC_PAT.findall(t))]
 
 
 class WorldNetworkBuilder:
+    PROVIDER_ID_PAT = re.compile(r'\b([A-Z]\d{2}[A-Z0-9]{3}[A-Z]\d{2}[A-Z0-9]{3})\b')
     def __init__(self): self.network = None
     def build(self, parsed, doc_id, doc_name):
         self.network = WorldNetwork(doc_id, doc_name)
@@ -274,7 +278,7 @@ class WorldNetworkBuilder:
         self.network.create_edge(src, rn.id, EdgeType.REFERENCE)
     def _extract_entities(self, parsed):
         t = parsed.get('raw_text', '')
-        for pid in re.findall(r'\b([A-Z]\d{2}[A-Z0-9]{3}[A-Z]\d{2}[A-Z0-9]{3})\b', t):
+        for pid in self.PROVIDER_ID_PAT.findall(t):
             eid = f"ent_{hashlib.md5(pid.encode()).hexdigest()[:8]}"
             if eid not in self.network.entities: self.network.entities[eid] = Entity(id=eid, name=pid, entity_type='provider_id', value=pid)
 
@@ -291,6 +295,7 @@ class HTMLContentParser(HTMLParser):
 
 
 class DeepLinkResolver:
+    TAG_PAT = re.compile(r'<[^>]+>'); WS_PAT = re.compile(r'\s+')
     def __init__(self, pdir=None): self.pdir = pdir; self.parser = SOPParser(); self.builder = WorldNetworkBuilder()
     def resolve_all(self, net, max_d=3):
         if not self.pdir: return net
@@ -331,7 +336,7 @@ class DeepLinkResolver:
         else:
             with open(fp, 'r', encoding='utf-8', errors='ignore') as f: content = f.read()
             p = HTMLContentParser(); p.feed(content); text = p.get_text()
-            if not text.strip(): text = re.sub(r'<[^>]+>', ' ', content); text = re.sub(r'\s+', ' ', text)
+            if not text.strip(): text = self.TAG_PAT.sub(' ', content); text = self.WS_PAT.sub(' ', text)
             return text
     def _merge(self, main, sub, pc):
         idmap = {}; lr = main.create_node(NodeType.LINKED_PROCEDURE, f"{pc}: {sub.document_name}", procedure_code=pc)
@@ -350,12 +355,12 @@ class DeepLinkResolver:
             if nr: main.claim_type_roots[f"{pc}/{cn}"] = nr
 
 
+# Any run of whitespace and/or control characters collapses to one space
+CTRL_WS_PAT = re.compile(r'[\s\x00-\x1f\x7f-\x9f]+')
+
 def clean_text(s):
     if not s: return ""
-    s = re.sub(r'[\x00-\x1f\x7f-\x9f]', ' ', s)
-    s = s.replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
-    s = re.sub(r'\s+', ' ', s).strip()
-    return s
+    return CTRL_WS_PAT.sub(' ', s).strip()
 
 
 def generate_html(net):